@@ -145,7 +145,7 @@ class AnomalyDetector:
         self.model.fit(X)
         
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump(self.model, self.model_path)
+        joblib.dump(self.model, self.model_path, compress=('lz4', 3))
         return True
     
     def _generate_training_data(self):
@@ -1,9 +1,20 @@
 import pandas as pd
 import numpy as np
 import os
-from datetime import datetime, timedelta
+import multiprocessing as mp
+from contextlib import nullcontext
 import json
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Parquet is preferred for the processed dataset; CSV is the fallback
+DATASET_EXT = '.parquet' if HAS_PYARROW else '.csv'
+
 # Data sources for Mohali/Chandigarh region
 DATA_SOURCES = {
     'cpcb_aq': {
@@ -64,133 +75,212 @@ MOHALI_PATTERNS = {
     }
 }
 
-def get_season(month):
-    if month in [3, 4, 5, 6]:
-        return 'summer'
-    elif month in [7, 8, 9]:
-        return 'monsoon'
-    elif month in [10, 11]:
-        return 'post_monsoon'
-    else:
-        return 'winter'
+NODES = [
+    {'id': 'CP-MOH-01', 'name': 'IT Park Sector 70', 'zone': 'commercial', 
+     'base_noise': 58, 'base_temp': 28, 'base_aqi': 85, 'base_crowd': 12},
+    {'id': 'CP-MOH-02', 'name': 'Phase 11', 'zone': 'residential',
+     'base_noise': 48, 'base_temp': 27, 'base_aqi': 75, 'base_crowd': 6},
+    {'id': 'CP-MOH-03', 'name': 'Phase 7', 'zone': 'mixed',
+     'base_noise': 52, 'base_temp': 27.5, 'base_aqi': 80, 'base_crowd': 10},
+    {'id': 'CP-MOH-04', 'name': 'Sector 77', 'zone': 'residential',
+     'base_noise': 45, 'base_temp': 26.5, 'base_aqi': 72, 'base_crowd': 5},
+    {'id': 'CP-MOH-05', 'name': 'Phase 3B2', 'zone': 'commercial',
+     'base_noise': 60, 'base_temp': 28.5, 'base_aqi': 88, 'base_crowd': 15}
+]
 
-def generate_mohali_dataset(days=30, interval_minutes=5):
-    """Generate realistic Mohali sensor data based on regional patterns"""
+SEASONS = ('summer', 'monsoon', 'post_monsoon', 'winter')
+
+ZONES = tuple(MOHALI_PATTERNS['zone_multipliers'])
+METRICS = ('noise', 'temp', 'aqi', 'crowd')
+
+# Month (1-12) -> index into SEASONS; index 0 is unused
+_MONTH_TO_SEASON = np.array([3, 3, 3, 0, 0, 0, 0, 1, 1, 1, 2, 2, 3], dtype=np.int8)
+
+# Relative std-dev of the per-reading variance and clamp range for each metric
+_VARIANCE = {'noise': 0.08, 'temp': 0.03, 'aqi': 0.12, 'crowd': 0.15}
+_CLAMP = {'noise': (35, 100), 'temp': (10, 45), 'aqi': (20, 300), 'crowd': (0, 40)}
+
+# MOHALI_PATTERNS as arrays: metric -> multipliers indexed by hour, SEASONS index or ZONES index
+_DIURNAL_LUT = {
+    metric: np.array([MOHALI_PATTERNS['diurnal'][metric][h] for h in range(24)], dtype=np.float32)
+    for metric in METRICS
+}
+_SEASON_LUT = {
+    metric: np.array([MOHALI_PATTERNS['seasonal'][s][metric] for s in SEASONS], dtype=np.float32)
+    for metric in METRICS
+}
+_ZONE_LUT = {
+    metric: np.array([MOHALI_PATTERNS['zone_multipliers'][z][metric] for z in ZONES], dtype=np.float32)
+    for metric in METRICS
+}
+
+def _generate_for_node(node, hours, season_idx, seed):
+    """Generate one node's readings for every timestamp of the time axis"""
     
-    nodes = [
-        {'id': 'CP-MOH-01', 'name': 'IT Park Sector 70', 'zone': 'commercial', 
-         'base_noise': 58, 'base_temp': 28, 'base_aqi': 85, 'base_crowd': 12},
-        {'id': 'CP-MOH-02', 'name': 'Phase 11', 'zone': 'residential',
-         'base_noise': 48, 'base_temp': 27, 'base_aqi': 75, 'base_crowd': 6},
-        {'id': 'CP-MOH-03', 'name': 'Phase 7', 'zone': 'mixed',
-         'base_noise': 52, 'base_temp': 27.5, 'base_aqi': 80, 'base_crowd': 10},
-        {'id': 'CP-MOH-04', 'name': 'Sector 77', 'zone': 'residential',
-         'base_noise': 45, 'base_temp': 26.5, 'base_aqi': 72, 'base_crowd': 5},
-        {'id': 'CP-MOH-05', 'name': 'Phase 3B2', 'zone': 'commercial',
-         'base_noise': 60, 'base_temp': 28.5, 'base_aqi': 88, 'base_crowd': 15}
-    ]
-    
-    records = []
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
-    current_time = start_time
-    
-    while current_time <= end_time:
-        hour = current_time.hour
-        month = current_time.month
-        season = get_season(month)
-        
-        for node in nodes:
-            zone = node['zone']
-            
-            # Apply diurnal patterns
-            noise_mult = MOHALI_PATTERNS['diurnal']['noise'][hour]
-            temp_mult = MOHALI_PATTERNS['diurnal']['temp'][hour]
-            aqi_mult = MOHALI_PATTERNS['diurnal']['aqi'][hour]
-            crowd_mult = MOHALI_PATTERNS['diurnal']['crowd'][hour]
-            
-            # Apply seasonal adjustments
-            seasonal = MOHALI_PATTERNS['seasonal'][season]
-            noise_mult *= seasonal['noise']
-            temp_mult *= seasonal['temp']
-            aqi_mult *= seasonal['aqi']
-            crowd_mult *= seasonal['crowd']
-            
-            # Apply zone multipliers
-            zone_mult = MOHALI_PATTERNS['zone_multipliers'][zone]
-            noise_mult *= zone_mult['noise']
-            temp_mult *= zone_mult['temp']
-            aqi_mult *= zone_mult['aqi']
-            crowd_mult *= zone_mult['crowd']
-            
-            # Calculate values with realistic variance
-            noise = node['base_noise'] * noise_mult * (1 + np.random.normal(0, 0.08))
-            temp = node['base_temp'] * temp_mult * (1 + np.random.normal(0, 0.03))
-            aqi = node['base_aqi'] * aqi_mult * (1 + np.random.normal(0, 0.12))
-            crowd = max(0, node['base_crowd'] * crowd_mult * (1 + np.random.normal(0, 0.15)))
-            
-            # Clamp to realistic ranges
-            noise = np.clip(noise, 35, 100)
-            temp = np.clip(temp, 10, 45)
-            aqi = np.clip(aqi, 20, 300)
-            crowd = np.clip(crowd, 0, 40)
-            
-            records.append({
-                'timestamp': current_time.isoformat(),
-                'node_id': node['id'],
-                'node_name': node['name'],
-                'zone_type': zone,
-                'noise': round(noise, 1),
-                'temperature': round(temp, 1),
-                'air_quality': int(aqi),
-                'crowd_density': int(crowd)
-            })
+    rng = np.random.default_rng(seed)
+    zone = ZONES.index(node['zone'])
+    
+    values = {}
+    for metric in METRICS:
+        mult = _DIURNAL_LUT[metric][hours] * _SEASON_LUT[metric][season_idx] * _ZONE_LUT[metric][zone]
         
-        current_time += timedelta(minutes=interval_minutes)
+        # Calculate values with realistic variance, clamped to realistic ranges
+        value = node[f'base_{metric}'] * mult * (1 + rng.normal(0, _VARIANCE[metric], size=hours.size))
+        values[metric] = np.clip(value, *_CLAMP[metric]).astype(np.float32)
+    
+    return values
+
+def _time_axis(days, interval_minutes):
+    """datetime64 timestamps covering the last `days` days"""
+    
+    end_time = pd.Timestamp.now()
+    start_time = end_time - pd.Timedelta(days=days)
+    return pd.date_range(start_time, end_time, freq=f'{interval_minutes}min', inclusive='both').to_numpy()
+
+def _node_pool(n_jobs):
+    """Worker pool for per-node generation, or a no-op context when n_jobs <= 1"""
     
-    return pd.DataFrame(records)
+    if n_jobs > 1:
+        return mp.Pool(min(n_jobs, len(NODES), os.cpu_count() or 1))
+    return nullcontext()
 
-def inject_anomalies(df, anomaly_rate=0.02):
+def _generate_chunk(times, seed=None, pool=None):
+    """Generate readings for every node over the given timestamps"""
+    
+    hours = (times.astype('datetime64[h]') - times.astype('datetime64[D]')).astype(np.int8)
+    months = (times.astype('datetime64[M]').astype(np.int64) % 12 + 1).astype(np.int8)
+    season_idx = _MONTH_TO_SEASON[months]
+    
+    # Nodes are independent; each gets its own RNG stream so results
+    # do not depend on whether they are generated in parallel
+    seeds = np.random.SeedSequence(seed).spawn(len(NODES))
+    args = [(node, hours, season_idx, node_seed) for node, node_seed in zip(NODES, seeds)]
+    if pool is not None:
+        per_node = pool.starmap(_generate_for_node, args)
+    else:
+        per_node = [_generate_for_node(*a) for a in args]
+    
+    # Rows are ordered timestamp-major, node-minor
+    n_times, n_nodes = len(times), len(NODES)
+    N = n_times * n_nodes
+    time_idx = np.repeat(np.arange(n_times), n_nodes)
+    node_idx = np.tile(np.arange(n_nodes), n_times)
+    zone_codes = np.array([ZONES.index(n['zone']) for n in NODES])
+    
+    # Preallocated typed columns, filled node by node through a (timestamp, node) view
+    columns = {metric: np.empty(N, dtype=np.float32) for metric in METRICS}
+    for j, values in enumerate(per_node):
+        for metric in METRICS:
+            columns[metric].reshape(n_times, n_nodes)[:, j] = values[metric]
+    
+    return pd.DataFrame({
+        'timestamp': times[time_idx],
+        'node_id': pd.Categorical.from_codes(node_idx, categories=[n['id'] for n in NODES]),
+        'node_name': pd.Categorical.from_codes(node_idx, categories=[n['name'] for n in NODES]),
+        'zone_type': pd.Categorical.from_codes(zone_codes[node_idx], categories=ZONES),
+        'noise': np.round(columns['noise'], 1, out=columns['noise']),
+        'temperature': np.round(columns['temp'], 1, out=columns['temp']),
+        'air_quality': columns['aqi'].astype(np.int16),
+        'crowd_density': columns['crowd'].astype(np.int16)
+    })
+
+def generate_mohali_dataset(days=30, interval_minutes=5, seed=None, n_jobs=1):
+    """Generate realistic Mohali sensor data based on regional patterns"""
+    
+    with _node_pool(n_jobs) as pool:
+        return _generate_chunk(_time_axis(days, interval_minutes), seed=seed, pool=pool)
+
+def inject_anomalies(df, anomaly_rate=0.02, seed=None):
     """Inject realistic anomalies into the dataset"""
     
-    n_anomalies = int(len(df) * anomaly_rate)
-    anomaly_indices = np.random.choice(df.index, n_anomalies, replace=False)
+    rng = np.random.default_rng(seed)
+    # Each row is independently anomalous with probability anomaly_rate
+    anomaly_indices = np.flatnonzero(rng.random(len(df)) < anomaly_rate)
+    n_anomalies = anomaly_indices.size
     
-    anomaly_types = ['noise_spike', 'heat_wave', 'pollution_event', 'crowd_surge']
+    # anomaly type -> (column, scale, uniform offset range, cap)
+    anomaly_types = {
+        'noise_spike': ('noise', 1.5, (10, 20), 100),
+        'heat_wave': ('temperature', 1.2, (3, 6), 45),
+        'pollution_event': ('air_quality', 1.8, (30, 60), 400),
+        'crowd_surge': ('crowd_density', 2, (5, 15), 50)
+    }
+    types = rng.integers(0, len(anomaly_types), size=n_anomalies)
+    offsets = rng.random(n_anomalies)
     
-    for idx in anomaly_indices:
-        anomaly_type = np.random.choice(anomaly_types)
-        
-        if anomaly_type == 'noise_spike':
-            df.loc[idx, 'noise'] = min(100, df.loc[idx, 'noise'] * 1.5 + np.random.uniform(10, 20))
-        elif anomaly_type == 'heat_wave':
-            df.loc[idx, 'temperature'] = min(45, df.loc[idx, 'temperature'] * 1.2 + np.random.uniform(3, 6))
-        elif anomaly_type == 'pollution_event':
-            df.loc[idx, 'air_quality'] = min(400, df.loc[idx, 'air_quality'] * 1.8 + np.random.uniform(30, 60))
-        elif anomaly_type == 'crowd_surge':
-            df.loc[idx, 'crowd_density'] = min(50, df.loc[idx, 'crowd_density'] * 2 + np.random.uniform(5, 15))
+    # One positional update per anomaly type
+    for k, (col, scale, (low, high), cap) in enumerate(anomaly_types.values()):
+        mask = types == k
+        idx = anomaly_indices[mask]
+        vals = df[col].values[idx]
+        df.iloc[idx, df.columns.get_loc(col)] = np.minimum(
+            cap, vals * scale + low + (high - low) * offsets[mask]
+        ).astype(df[col].dtype)
     
     return df
 
-if __name__ == '__main__':
-    print("Generating Mohali sensor dataset...")
+def write_mohali_dataset(output_path, days=30, interval_minutes=5, anomaly_rate=0.02, seed=None, n_jobs=1):
+    """Generate the dataset with anomalies and stream it to disk one day at a time"""
+    
+    output_path = os.path.splitext(output_path)[0] + DATASET_EXT
+    times = _time_axis(days, interval_minutes)
+    steps_per_day = max(1, (24 * 60) // interval_minutes)
+    chunk_starts = range(0, len(times), steps_per_day)
     
-    # Generate 30 days of data at 5-minute intervals
-    df = generate_mohali_dataset(days=30, interval_minutes=5)
+    # Independent generation and anomaly seeds for every chunk
+    chunk_seeds = np.random.SeedSequence(seed).generate_state(2 * len(chunk_starts))
     
-    # Inject anomalies
-    df = inject_anomalies(df, anomaly_rate=0.02)
+    writer = None
+    n_records = 0
+    # One pool shared by every chunk, so start-up is paid once
+    with _node_pool(n_jobs) as pool:
+        try:
+            for i, start in enumerate(chunk_starts):
+                chunk = _generate_chunk(times[start:start + steps_per_day], seed=chunk_seeds[2 * i], pool=pool)
+                chunk = inject_anomalies(chunk, anomaly_rate, seed=chunk_seeds[2 * i + 1])
+                
+                if HAS_PYARROW:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, table.schema, compression='snappy')
+                    writer.write_table(table)
+                else:
+                    chunk.to_csv(
+                        output_path, mode='a' if i else 'w', header=not i, index=False,
+                        date_format='%Y-%m-%dT%H:%M:%S.%f'
+                    )
+                n_records += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    
+    return output_path, n_records
+
+def load_dataset(data_path):
+    """Load a dataset written by write_mohali_dataset"""
+    
+    if data_path.endswith('.parquet'):
+        return pd.read_parquet(data_path)
+    return pd.read_csv(
+        data_path,
+        parse_dates=['timestamp'],
+        dtype={'node_id': 'category', 'node_name': 'category', 'zone_type': 'category'}
+    )
+
+if __name__ == '__main__':
+    print("Generating Mohali sensor dataset...")
     
-    # Save to processed folder
     output_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed')
     os.makedirs(output_dir, exist_ok=True)
     
-    output_path = os.path.join(output_dir, 'mohali_sensor_data.csv')
-    df.to_csv(output_path, index=False)
+    # Generate 30 days of data at 5-minute intervals with anomalies, one day per chunk
+    output_path, n_records = write_mohali_dataset(
+        os.path.join(output_dir, 'mohali_sensor_data'), days=30, interval_minutes=5, anomaly_rate=0.02
+    )
     
-    print(f"Generated {len(df)} records")
+    print(f"Generated {n_records} records")
     print(f"Saved to {output_path}")
     
     # Print summary statistics
     print("\nDataset Statistics:")
-    print(df.describe())
+    print(load_dataset(output_path).describe())
@@ -11,42 +11,48 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import MOHALI_CONFIG
 
 class AnomalyModelTrainer:
-    def __init__(self):
+    def __init__(self, n_estimators=100, max_samples=1024):
         self.model = None
         self.scaler = None
         self.feature_cols = ['noise', 'temperature', 'air_quality', 'crowd_density']
+        self.n_estimators = n_estimators
+        self.max_samples = max_samples
+        # Scored training frame, reused by evaluate_samples
+        self._df = None
+        self._scores = None
         self.models_dir = os.path.join(os.path.dirname(__file__), '..', 'models')
         os.makedirs(self.models_dir, exist_ok=True)
     
     def load_data(self, data_path=None):
+        from data_generator import DATASET_EXT, load_dataset, write_mohali_dataset
+        
         if data_path is None:
             data_path = os.path.join(
-                os.path.dirname(__file__), '..', 'data', 'processed', 'mohali_sensor_data.csv'
+                os.path.dirname(__file__), '..', 'data', 'processed', 'mohali_sensor_data' + DATASET_EXT
             )
         
         if not os.path.exists(data_path):
             print(f"Data file not found: {data_path}")
             print("Generating synthetic training data...")
-            from data_generator import generate_mohali_dataset, inject_anomalies
-            df = generate_mohali_dataset(days=30, interval_minutes=5)
-            df = inject_anomalies(df, anomaly_rate=0.02)
             os.makedirs(os.path.dirname(data_path), exist_ok=True)
-            df.to_csv(data_path, index=False)
+            data_path, _ = write_mohali_dataset(data_path, days=30, interval_minutes=5, anomaly_rate=0.02)
         
-        return pd.read_csv(data_path)
+        return load_dataset(data_path)
     
     def preprocess(self, df):
-        df = df.copy()
+        """Add time features to df in place and return it (no copy is made)"""
         
-        # Parse timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Parse timestamp (already datetime64 when loaded from Parquet)
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
         df['hour'] = df['timestamp'].dt.hour
         df['day_of_week'] = df['timestamp'].dt.dayofweek
         df['month'] = df['timestamp'].dt.month
         
         # Add time-based features
-        df['is_peak_hour'] = df['hour'].isin([8, 9, 17, 18, 19]).astype(int)
-        df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+        hour = df['hour'].to_numpy(np.int8)
+        df['is_peak_hour'] = ((hour == 8) | (hour == 9) | ((hour >= 17) & (hour <= 19))).astype(np.int8)
+        df['is_weekend'] = (df['day_of_week'].to_numpy(np.int8) >= 5).astype(np.int8)
         
         return df
     
@@ -60,6 +66,23 @@ class AnomalyModelTrainer:
             (n_score * 0.4) + (t_score * 0.25) + (a_score * 0.2) + (d_score * 0.15)
         ))
     
+    def calculate_stress_index_vec(self, df):
+        # Always compute in float64 so results match calculate_stress_index
+        # whatever dtypes the frame's columns have
+        noise = df['noise'].to_numpy(np.float64)
+        temp = df['temperature'].to_numpy(np.float64)
+        aqi = df['air_quality'].to_numpy(np.float64)
+        crowd = df['crowd_density'].to_numpy(np.float64)
+        
+        n_score = np.minimum(((noise - 40) / 60) * 100, 100)
+        t_score = np.minimum(((temp - 15) / 25) * 100, 100)
+        a_score = np.minimum((aqi / 150) * 100, 100)
+        d_score = np.minimum((crowd / 30) * 100, 100)
+        
+        return np.maximum(0, np.round(
+            (n_score * 0.4) + (t_score * 0.25) + (a_score * 0.2) + (d_score * 0.15)
+        )).astype(int)
+    
     def train(self, contamination=0.02):
         print("Loading data...")
         df = self.load_data()
@@ -70,38 +93,41 @@ class AnomalyModelTrainer:
         df = self.preprocess(df)
         
         # Calculate stress index
-        df['stress_index'] = df.apply(self.calculate_stress_index, axis=1)
+        df['stress_index'] = self.calculate_stress_index_vec(df)
         
-        # Prepare features
-        X = df[self.feature_cols].values
+        # Prepare features (float32 halves memory traffic through the scaler and forest)
+        X = df[self.feature_cols].to_numpy(dtype=np.float32)
         
         # Scale features
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        self.scaler = StandardScaler().fit(X)
+        X_scaled = self.scaler.transform(X, copy=False)
         
         print(f"Training Isolation Forest (contamination={contamination})...")
         
         self.model = IsolationForest(
-            n_estimators=200,
+            n_estimators=self.n_estimators,
             contamination=contamination,
-            max_samples='auto',
+            max_samples=self.max_samples,
             random_state=42,
             n_jobs=-1,
-            bootstrap=True
+            bootstrap=False
         )
         
         self.model.fit(X_scaled)
         
-        # Evaluate
-        predictions = self.model.predict(X_scaled)
-        anomaly_count = np.sum(predictions == -1)
-        anomaly_rate = anomaly_count / len(predictions)
+        # Evaluate (predict() flags exactly the samples with a negative decision_function)
+        scores = -self.model.decision_function(X_scaled)  # Higher score = more anomalous
+        anomaly_count = np.sum(scores > 0)
+        anomaly_rate = anomaly_count / len(scores)
         
         print(f"Training complete")
         print(f"Detected anomalies: {anomaly_count} ({anomaly_rate*100:.2f}%)")
         
         # Analyze anomalies
-        df['is_anomaly'] = predictions == -1
+        df['is_anomaly'] = scores > 0
+        df['anomaly_score'] = scores
+        self._df = df
+        self._scores = scores
         anomalies = df[df['is_anomaly']]
         
         print("\nAnomaly Statistics:")
@@ -124,33 +150,53 @@ class AnomalyModelTrainer:
         model_path = os.path.join(self.models_dir, 'anomaly_model.pkl')
         scaler_path = os.path.join(self.models_dir, 'anomaly_scaler.pkl')
         
-        joblib.dump(self.model, model_path)
-        joblib.dump(self.scaler, scaler_path)
+        joblib.dump(self.model, model_path, compress=('lz4', 3))
+        joblib.dump(self.scaler, scaler_path, compress=('lz4', 3))
         
         print(f"Model saved to {model_path}")
         print(f"Scaler saved to {scaler_path}")
     
-    def evaluate_samples(self, n_samples=10):
-        df = self.load_data()
-        df = self.preprocess(df)
-        
-        X = df[self.feature_cols].values
-        X_scaled = self.scaler.transform(X)
-        
-        predictions = self.model.predict(X_scaled)
-        scores = self.model.decision_function(X_scaled)
-        
-        df['anomaly_pred'] = predictions == -1
-        df['anomaly_score'] = -scores  # Higher score = more anomalous
-        df['stress_index'] = df.apply(self.calculate_stress_index, axis=1)
+    def evaluate_samples(self, n_samples=10, refresh=False):
+        # Reuse the frame scored by train() unless a reload is requested
+        if refresh or self._df is None:
+            df = self.load_data()
+            df = self.preprocess(df)
+            
+            X = df[self.feature_cols].to_numpy(dtype=np.float32)
+            X_scaled = self.scaler.transform(X, copy=False)
+            
+            scores = -self.model.decision_function(X_scaled)  # Higher score = more anomalous
+            
+            df['is_anomaly'] = scores > 0
+            df['anomaly_score'] = scores
+            df['stress_index'] = self.calculate_stress_index_vec(df)
+            self._df = df
+            self._scores = scores
+        
+        df = self._df
+        
+        # Top-k anomalies by score: O(N) partition, then sort only the k winners
+        rows = np.flatnonzero(df['is_anomaly'].values)
+        scores = self._scores[rows]
+        k = min(n_samples, scores.size)
+        top = np.argpartition(-scores, k)[:k] if k < scores.size else np.arange(k)
+        top = top[np.argsort(-scores[top])]
+        rows = rows[top]
         
         print("\nSample Anomalies:")
-        anomalies = df[df['anomaly_pred']].nlargest(n_samples, 'anomaly_score')
-        
-        for _, row in anomalies.iterrows():
-            print(f"  {row['node_id']} @ {row['timestamp']}")
-            print(f"    Stress: {row['stress_index']}, Score: {row['anomaly_score']:.3f}")
-            print(f"    Noise: {row['noise']}, Temp: {row['temperature']}, AQI: {row['air_quality']}, Crowd: {row['crowd_density']}")
+        for node_id, timestamp, stress, score, noise, temp, aqi, crowd in zip(
+            df['node_id'].to_numpy()[rows],
+            df['timestamp'].iloc[rows].tolist(),
+            df['stress_index'].to_numpy()[rows],
+            scores[top],
+            df['noise'].to_numpy()[rows],
+            df['temperature'].to_numpy()[rows],
+            df['air_quality'].to_numpy()[rows],
+            df['crowd_density'].to_numpy()[rows]
+        ):
+            print(f"  {node_id} @ {timestamp}")
+            print(f"    Stress: {stress}, Score: {score:.3f}")
+            print(f"    Noise: {noise:.1f}, Temp: {temp:.1f}, AQI: {aqi}, Crowd: {crowd}")
             print()
 
 if __name__ == '__main__':